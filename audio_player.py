@@ -5,16 +5,58 @@
 提供音频播放和录音功能
 """
 
+import array
+import atexit
 import numpy as np
 import pyaudio
+import queue
 import threading
-import time
+from collections import deque
 from typing import Optional, Callable
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, pyqtSignal, QIODevice
+from PyQt6.QtMultimedia import QAudio, QAudioFormat, QAudioSink
+
+# 进程内共享的PyAudio实例，避免重复初始化PortAudio
+_PA = None
+
+
+def get_pyaudio() -> pyaudio.PyAudio:
+    """获取共享的PyAudio实例，首次调用时创建并在退出时释放"""
+    global _PA
+    if _PA is None:
+        _PA = pyaudio.PyAudio()
+        atexit.register(_PA.terminate)
+    return _PA
+
+
+class _ArrayReader(QIODevice):
+    """以只读QIODevice的形式提供float32数组中的音频数据"""
+    def __init__(self, audio_data: np.ndarray, parent=None):
+        super().__init__(parent)
+        self._view = memoryview(audio_data).cast('B')
+        self._pos = 0
+
+    def readData(self, maxlen: int) -> bytes:
+        """返回下一块数据，读完后返回空数据"""
+        chunk = self._view[self._pos:self._pos + maxlen]
+        self._pos += len(chunk)
+        return chunk.tobytes()
+
+    def writeData(self, data) -> int:
+        """只读设备，不支持写入"""
+        return -1
+
+    def bytesAvailable(self) -> int:
+        """剩余可读字节数"""
+        return len(self._view) - self._pos + super().bytesAvailable()
+
+    def isSequential(self) -> bool:
+        """按顺序读取的设备"""
+        return True
 
 
 class AudioPlayer(QObject):
-    """音频播放器类"""
+    """音频播放器类（基于Qt Multimedia，需在主线程中使用）"""
     playback_finished = pyqtSignal()
     playback_started = pyqtSignal()
     playback_error = pyqtSignal(str)
@@ -22,9 +64,8 @@ class AudioPlayer(QObject):
     def __init__(self):
         super().__init__()
         self.is_playing = False
-        self.audio_stream = None
-        self.p = pyaudio.PyAudio()
-        self.playback_thread = None
+        self._sink = None
+        self._reader = None
 
     def play_audio(self, audio_data: np.ndarray, sample_rate: int = 16000):
         """播放音频数据"""
@@ -32,72 +73,70 @@ class AudioPlayer(QObject):
             self.stop_playback()
 
         try:
-            # 确保音频数据是正确的格式
-            if audio_data.dtype != np.float32:
-                audio_data = audio_data.astype(np.float32)
+            original = audio_data
+            # 确保音频数据是连续的float32数组，必要时只复制一次
+            audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
             
-            # 归一化音频数据
-            if np.max(np.abs(audio_data)) > 1.0:
-                audio_data = audio_data / np.max(np.abs(audio_data))
-
-            self.playback_thread = threading.Thread(
-                target=self._play_audio_thread,
-                args=(audio_data, sample_rate)
-            )
-            self.playback_thread.daemon = True
-            self.playback_thread.start()
-
-        except Exception as e:
-            self.playback_error.emit(f"播放出错: {str(e)}")
-
-    def _play_audio_thread(self, audio_data: np.ndarray, sample_rate: int):
-        """音频播放线程"""
-        try:
+            # 归一化音频数据（峰值只计算一次，且不生成abs临时数组）
+            peak = max(float(audio_data.max()), -float(audio_data.min()))
+            if peak > 1.0:
+                if audio_data is original:
+                    audio_data = audio_data * np.float32(1.0 / peak)
+                else:
+                    np.multiply(audio_data, np.float32(1.0 / peak), out=audio_data)
+
+            audio_format = QAudioFormat()
+            audio_format.setSampleRate(sample_rate)
+            audio_format.setChannelCount(1)
+            audio_format.setSampleFormat(QAudioFormat.SampleFormat.Float)
+
+            # 由QAudioSink直接从数组按块拉取，不复制整段数据
+            self._reader = _ArrayReader(audio_data, self)
+            self._reader.open(QIODevice.OpenModeFlag.ReadOnly)
+
+            self._sink = QAudioSink(audio_format, self)
+            self._sink.stateChanged.connect(self._on_state_changed)
             self.is_playing = True
+            self._sink.start(self._reader)
             self.playback_started.emit()
 
-            # 打开音频流
-            stream = self.p.open(
-                format=pyaudio.paFloat32,
-                channels=1,
-                rate=sample_rate,
-                output=True,
-                frames_per_buffer=1024
-            )
-
-            # 分块播放音频
-            chunk_size = 1024
-            for i in range(0, len(audio_data), chunk_size):
-                if not self.is_playing:
-                    break
-                
-                chunk = audio_data[i:i + chunk_size]
-                # 确保chunk的长度
-                if len(chunk) < chunk_size:
-                    chunk = np.pad(chunk, (0, chunk_size - len(chunk)), 'constant')
-                
-                stream.write(chunk.tobytes())
-
-            stream.stop_stream()
-            stream.close()
-
         except Exception as e:
-            self.playback_error.emit(f"播放线程出错: {str(e)}")
-        finally:
+            self._release()
             self.is_playing = False
-            self.playback_finished.emit()
+            self.playback_error.emit(f"播放出错: {str(e)}")
+
+    def _on_state_changed(self, state: QAudio.State):
+        """音频输出状态变化：数据播完或设备出错时结束播放"""
+        if state == QAudio.State.IdleState:
+            self.stop_playback()
+        elif state == QAudio.State.StoppedState and self._sink is not None:
+            if self._sink.error() != QAudio.Error.NoError:
+                self.playback_error.emit(f"播放出错: {self._sink.error().name}")
+            self.stop_playback()
+
+    def _release(self):
+        """停止并释放音频输出和缓冲区"""
+        if self._sink is not None:
+            self._sink.stateChanged.disconnect(self._on_state_changed)
+            self._sink.stop()
+            self._sink.deleteLater()
+            self._sink = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader.deleteLater()
+            self._reader = None
 
     def stop_playback(self):
         """停止播放"""
-        self.is_playing = False
-        if self.playback_thread and self.playback_thread.is_alive():
-            self.playback_thread.join(timeout=1.0)
+        self._release()
+        if self.is_playing:
+            self.is_playing = False
+            self.playback_finished.emit()
 
     def __del__(self):
         """析构函数"""
         try:
             self.stop_playback()
-            self.p.terminate()
         except:
             pass
 
@@ -107,13 +146,20 @@ class AudioRecorder(QObject):
     recording_started = pyqtSignal()
     recording_finished = pyqtSignal(np.ndarray, int)  # audio_data, sample_rate
     recording_error = pyqtSignal(str)
+    recording_trimmed = pyqtSignal()  # 录音超过时长上限，开始丢弃最早的数据
 
-    def __init__(self, sample_rate: int = 16000):
+    def __init__(self, sample_rate: int = 16000, max_seconds: int = 300):
         super().__init__()
         self.sample_rate = sample_rate
+        self.max_seconds = max_seconds  # 录音保留的最长时长，超出部分按先进先出丢弃
         self.is_recording = False
-        self.audio_data = []
-        self.p = pyaudio.PyAudio()
+        self._trimmed = False
+        # 录音缓冲区，直接追加原始float32字节
+        self._rec = array.array('f')
+        # PortAudio回调与录音线程之间的单生产者/单消费者队列
+        self._queue = queue.SimpleQueue()
+        self._stop_evt = threading.Event()
+        self.p = get_pyaudio()
         self.recording_thread = None
 
     def start_recording(self):
@@ -122,7 +168,10 @@ class AudioRecorder(QObject):
             return
 
         try:
-            self.audio_data = []
+            self._rec = array.array('f')
+            self._trimmed = False
+            self._queue = queue.SimpleQueue()
+            self._stop_evt.clear()
             self.recording_thread = threading.Thread(target=self._recording_thread)
             self.recording_thread.daemon = True
             self.recording_thread.start()
@@ -135,30 +184,32 @@ class AudioRecorder(QObject):
             self.is_recording = True
             self.recording_started.emit()
 
-            # 打开音频流
+            # 以回调模式打开音频流，由PortAudio线程推送数据
             stream = self.p.open(
                 format=pyaudio.paFloat32,
                 channels=1,
                 rate=self.sample_rate,
                 input=True,
-                frames_per_buffer=1024
+                frames_per_buffer=256,
+                stream_callback=self._stream_callback
             )
+            stream.start_stream()
 
-            while self.is_recording:
-                try:
-                    data = stream.read(1024, exception_on_overflow=False)
-                    audio_chunk = np.frombuffer(data, dtype=np.float32)
-                    self.audio_data.extend(audio_chunk)
-                except Exception as e:
-                    print(f"录音数据读取错误: {e}")
+            # 每50毫秒将队列中的数据取出写入缓冲区，收到停止事件时立即退出
+            while not self._stop_evt.wait(0.05):
+                if not stream.is_active():
+                    print("录音数据读取错误: 音频流已中断")
                     break
+                self._drain_queue()
 
             stream.stop_stream()
             stream.close()
+            self._drain_queue()
 
-            # 转换为numpy数组
-            if self.audio_data:
-                audio_array = np.array(self.audio_data, dtype=np.float32)
+            # 截取最近max_seconds秒的数据
+            if self._rec:
+                start = max(0, len(self._rec) - self._max_samples())
+                audio_array = np.frombuffer(self._rec, dtype=np.float32)[start:].copy()
                 self.recording_finished.emit(audio_array, self.sample_rate)
             else:
                 self.recording_error.emit("录音数据为空")
@@ -168,9 +219,38 @@ class AudioRecorder(QObject):
         finally:
             self.is_recording = False
 
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio回调，只入队原始字节，不做其他处理"""
+        self._queue.put(in_data)
+        return (None, pyaudio.paContinue)
+
+    def _drain_queue(self):
+        """取出队列中的全部音频块写入缓冲区"""
+        while True:
+            try:
+                data = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._append(data)
+
+    def _max_samples(self) -> int:
+        """录音保留的最大样本数"""
+        return self.max_seconds * self.sample_rate
+
+    def _append(self, data: bytes):
+        """将原始音频字节追加到缓冲区"""
+        self._rec.frombytes(data)
+        max_samples = self._max_samples()
+        if len(self._rec) > 2 * max_samples:
+            # 缓冲区最多容纳两倍上限，超出后只保留最近的数据，搬移开销被均摊
+            del self._rec[:len(self._rec) - max_samples]
+            if not self._trimmed:
+                self._trimmed = True
+                self.recording_trimmed.emit()
+
     def stop_recording(self):
         """停止录音"""
-        self.is_recording = False
+        self._stop_evt.set()
         if self.recording_thread and self.recording_thread.is_alive():
             self.recording_thread.join(timeout=2.0)
 
@@ -178,7 +258,6 @@ class AudioRecorder(QObject):
         """析构函数"""
         try:
             self.stop_recording()
-            self.p.terminate()
         except:
             pass
 
@@ -195,13 +274,21 @@ class AudioManager(QObject):
         self.player.playback_error.connect(self._on_playback_error)
         self.recorder.recording_finished.connect(self._on_recording_finished)
         self.recorder.recording_error.connect(self._on_recording_error)
+        self.recorder.recording_trimmed.connect(self._on_recording_trimmed)
         
-        self.current_callback = None
+        # 播放和录音的回调分开保存，管理器可被多个组件共享
+        self.playback_callback = None
+        self.recording_callback = None
+        # 录音完成信号经队列异步到达，按录音启动顺序保存各次录音的回调
+        self._pending_recording_callbacks = deque()
 
     def play_audio(self, audio_data: np.ndarray, sample_rate: int = 16000, 
                    callback: Optional[Callable] = None):
         """播放音频"""
-        self.current_callback = callback
+        if self.player.is_playing:
+            # 打断正在进行的播放，完成信号会通知其发起方
+            self.player.stop_playback()
+        self.playback_callback = callback
         self.player.play_audio(audio_data, sample_rate)
 
     def stop_playback(self):
@@ -210,17 +297,44 @@ class AudioManager(QObject):
 
     def start_recording(self, callback: Optional[Callable] = None):
         """开始录音"""
-        self.current_callback = callback
+        if self.recorder.is_recording:
+            # 打断正在进行的录音，录音结果仍交给其发起方
+            self.recorder.stop_recording()
+        self.recording_callback = callback
+        self._pending_recording_callbacks.append(callback)
         self.recorder.start_recording()
 
     def stop_recording(self):
         """停止录音"""
         self.recorder.stop_recording()
 
+    def owns_playback(self, callback: Callable) -> bool:
+        """当前播放是否由该回调的发起方启动"""
+        return self.player.is_playing and self.playback_callback == callback
+
+    def owns_recording(self, callback: Callable) -> bool:
+        """当前录音是否由该回调的发起方启动"""
+        return self.recorder.is_recording and self.recording_callback == callback
+
+    def clear_callbacks(self):
+        """清除所有已保存的回调，回调的发起方即将销毁时调用"""
+        self.playback_callback = None
+        self.recording_callback = None
+        # 已停止录音的完成信号可能仍在途中，保留占位以维持顺序
+        self._pending_recording_callbacks = deque(
+            [None] * len(self._pending_recording_callbacks)
+        )
+
+    def _pop_recording_callback(self) -> Optional[Callable]:
+        """取出最早一次录音对应的回调"""
+        if self._pending_recording_callbacks:
+            return self._pending_recording_callbacks.popleft()
+        return None
+
     def _on_playback_finished(self):
         """播放完成回调"""
-        if self.current_callback:
-            self.current_callback()
+        if self.playback_callback:
+            self.playback_callback()
 
     def _on_playback_error(self, error_msg: str):
         """播放错误回调"""
@@ -228,13 +342,19 @@ class AudioManager(QObject):
 
     def _on_recording_finished(self, audio_data: np.ndarray, sample_rate: int):
         """录音完成回调"""
-        if self.current_callback:
-            self.current_callback(audio_data, sample_rate)
+        callback = self._pop_recording_callback()
+        if callback:
+            callback(audio_data, sample_rate)
 
     def _on_recording_error(self, error_msg: str):
         """录音错误回调"""
+        self._pop_recording_callback()
         print(f"录音错误: {error_msg}")
 
+    def _on_recording_trimmed(self):
+        """录音超长回调"""
+        print(f"录音超过{self.recorder.max_seconds}秒，仅保留最近的部分")
+
     def is_playing(self) -> bool:
         """是否正在播放"""
         return self.player.is_playing
@@ -137,9 +137,9 @@ echo "预下载Whisper模型..."
 echo "这将下载small模型（约244MB），请耐心等待..."
 
 python3 -c "
-import whisper
+from faster_whisper import WhisperModel
 try:
-    model = whisper.load_model('small')
+    model = WhisperModel('small', device='cpu', compute_type='int8')
     print('✓ small模型下载完成')
 except Exception as e:
     print(f'⚠ 模型下载失败: {e}')
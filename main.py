@@ -7,20 +7,11 @@
 
 import sys
 import os
-import threading
-import time
+from math import gcd
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Tuple, Optional
 
-import whisper
-import librosa
 import numpy as np
-from pydub import AudioSegment
-import matplotlib
-matplotlib.use("qtagg")
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
@@ -68,71 +59,95 @@ class WhisperWorker(QThread):
 
     def run(self):
         try:
-            # 加载Whisper模型
-            self.model = whisper.load_model(self.model_size)
+            # Whisper相关模块较重，在工作线程中才导入，不影响启动速度
+            import ctranslate2
+            from faster_whisper import WhisperModel
+            
+            # 加载Whisper模型（GPU上使用fp16，CPU上使用int8量化推理）
+            use_cuda = ctranslate2.get_cuda_device_count() > 0
+            self.model = WhisperModel(
+                self.model_size,
+                device="cuda" if use_cuda else "cpu",
+                compute_type="float16" if use_cuda else "int8"
+            )
             
             # 加载音频文件
-            audio_data, sample_rate = librosa.load(self.audio_path, sr=16000)
+            audio_data, sample_rate = self._load_audio()
+            # 统一为连续的float32数组，之后各段落切片均为零拷贝视图
+            audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
             
-            # 执行转录，获取word-level时间戳
-            result = self.model.transcribe(
-                self.audio_path,
-                word_timestamps=True,
-                verbose=False
+            # 执行转录，获取word-level时间戳（段落以生成器形式逐个返回）
+            segments, info = self.model.transcribe(
+                audio_data,
+                beam_size=1,  # 与原Whisper实现一致，使用贪心解码
+                word_timestamps=True
             )
             
             # 发送语言检测信号
-            detected_language = result.get('language', 'unknown')
-            language_confidence = 0.9  # Whisper没有直接提供置信度，使用估计值
-            self.language_detected.emit(detected_language, language_confidence)
-            
-            # 处理分段
-            segments = self._process_segments(result, audio_data, sample_rate)
+            self.language_detected.emit(info.language, info.language_probability)
             
             # 逐个发送完成的段落
-            for i, segment in enumerate(segments):
+            for segment_data in segments:
                 if not self.is_running:
                     break
                     
+                segment = self._create_segment(segment_data, audio_data, sample_rate)
                 self.segment_completed.emit(segment)
-                progress = int((i + 1) / len(segments) * 100)
-                self.progress_updated.emit(progress)
-                
-                # 模拟处理时间，避免界面卡顿
-                self.msleep(100)
+                if info.duration > 0:
+                    progress = int(min(segment_data.end / info.duration, 1.0) * 100)
+                    self.progress_updated.emit(progress)
             
+            self.progress_updated.emit(100)
             self.transcription_finished.emit()
             
         except Exception as e:
             self.error_occurred.emit(str(e))
 
-    def _process_segments(self, result: Dict, audio_data: np.ndarray, 
-                         sample_rate: int) -> List[AudioSegment]:
-        """处理Whisper结果，创建音频段落"""
-        segments = []
-        
-        for segment_data in result['segments']:
-            start_time = segment_data['start']
-            end_time = segment_data['end']
-            text = segment_data['text'].strip()
-            
-            # 提取对应的音频片段
-            start_sample = int(start_time * sample_rate)
-            end_sample = int(end_time * sample_rate)
-            segment_audio = audio_data[start_sample:end_sample]
-            
-            # 创建AudioSegment对象
-            audio_segment = AudioSegment(
-                text=text,
-                start_time=start_time,
-                end_time=end_time,
-                audio_data=segment_audio,
-                sample_rate=sample_rate
-            )
-            
-            segments.append(audio_segment)
+    def _load_audio(self) -> Tuple[np.ndarray, int]:
+        """加载音频为16kHz单声道float32数组"""
+        # 音频解码模块按需导入
+        import soundfile as sf
+        from scipy.signal import resample_poly
         
-        return segments
+        try:
+            audio_data, sample_rate = sf.read(self.audio_path, dtype='float32')
+        except RuntimeError:
+            # soundfile不支持的格式（如m4a）交给librosa解码
+            import librosa
+            return librosa.load(self.audio_path, sr=16000)
+        
+        # 多声道取平均
+        if audio_data.ndim == 2:
+            audio_data = audio_data.mean(axis=1, dtype=np.float32)
+        
+        # 非16kHz时使用多相滤波重采样
+        if sample_rate != 16000:
+            g = gcd(sample_rate, 16000)
+            audio_data = resample_poly(audio_data, 16000 // g, sample_rate // g)
+            sample_rate = 16000
+        
+        return audio_data, sample_rate
+
+    def _create_segment(self, segment_data, audio_data: np.ndarray, 
+                        sample_rate: int) -> AudioSegment:
+        """根据Whisper返回的段落创建音频段落"""
+        start_time = segment_data.start
+        end_time = segment_data.end
+        text = segment_data.text.strip()
+        
+        # 提取对应的音频片段
+        start_sample = int(start_time * sample_rate)
+        end_sample = int(end_time * sample_rate)
+        segment_audio = audio_data[start_sample:end_sample]
+        
+        # 创建AudioSegment对象
+        return AudioSegment(
+            text=text,
+            start_time=start_time,
+            end_time=end_time,
+            audio_data=segment_audio,
+            sample_rate=sample_rate
+        )
 
     def stop(self):
         """停止转录任务"""
@@ -143,9 +158,22 @@ class WaveformWidget(QWidget):
     """波形图显示组件"""
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.figure = Figure(figsize=(10, 2))
+        # matplotlib在首次创建波形组件时才导入，加快启动
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        
+        # 紧凑布局引擎随画布尺寸变化自动重新布局
+        self.figure = Figure(figsize=(10, 2), layout="tight")
         self.canvas = FigureCanvas(self.figure)
         
+        # 坐标轴和曲线只创建一次，重绘时仅更新数据
+        self.ax = self.figure.add_subplot(111)
+        self.line, = self.ax.plot([], [], 'b-', linewidth=0.5)
+        self.ax.set_title("波形图", fontsize=10)
+        self.ax.set_xlabel('时间 (秒)')
+        self.ax.set_ylabel('振幅')
+        self.ax.grid(True, alpha=0.3)
+        
         layout = QVBoxLayout()
         layout.addWidget(self.canvas)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -154,30 +182,35 @@ class WaveformWidget(QWidget):
     def plot_waveform(self, audio_data: np.ndarray, sample_rate: int, 
                      title: str = "波形图"):
         """绘制波形图"""
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        
-        # 创建时间轴
-        time_axis = np.linspace(0, len(audio_data) / sample_rate, len(audio_data))
-        
-        # 绘制波形
-        ax.plot(time_axis, audio_data, 'b-', linewidth=0.5)
-        ax.set_title(title, fontsize=10)
-        ax.set_xlabel('时间 (秒)')
-        ax.set_ylabel('振幅')
-        ax.grid(True, alpha=0.3)
-        
-        # 设置紧凑布局
-        self.figure.tight_layout()
-        self.canvas.draw()
+        # 样本过多时按区间取最小/最大值降采样，保留波形包络
+        target = 2000
+        n = len(audio_data)
+        if n > target:
+            # 向上取整，保证末尾不足一个区间的样本也被计入
+            stride = -(-n // target)
+            from waveform import compute_envelope
+            plot_data = compute_envelope(np.ascontiguousarray(audio_data), stride)
+            bucket_starts = np.arange(0, n, stride, dtype=np.float32)
+            time_axis = np.repeat(bucket_starts * np.float32(1.0 / sample_rate), 2)
+        else:
+            plot_data = audio_data
+            # 创建时间轴
+            time_axis = np.arange(n, dtype=np.float32) * np.float32(1.0 / sample_rate)
+        
+        # 更新波形数据
+        self.ax.set_title(title, fontsize=10)
+        self.line.set_data(time_axis, plot_data)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
 
 
 class AudioSegmentWidget(QFrame):
     """单个音频段落的显示组件"""
-    def __init__(self, segment: AudioSegment, parent=None):
+    def __init__(self, segment: AudioSegment, audio_manager=None, parent=None):
         super().__init__(parent)
         self.segment = segment
-        self.audio_manager = AudioManager() if AudioManager else None
+        self.audio_manager = audio_manager
         
         self.setFrameStyle(QFrame.Shape.Box)
         self.setStyleSheet("QFrame { border: 1px solid gray; margin: 5px; }")
@@ -254,16 +287,17 @@ class AudioSegmentWidget(QFrame):
             QMessageBox.warning(self, "警告", "音频播放功能不可用")
             return
             
-        if not self.audio_manager.is_playing():
+        if self.audio_manager.owns_playback(self._stop_playing):
+            self.audio_manager.stop_playback()
+            self._stop_playing()
+        else:
+            # 其他播放（包括其他段落的）由管理器打断并通知其发起方
             self.play_button.setText("停止播放")
             self.audio_manager.play_audio(
                 self.segment.audio_data, 
                 self.segment.sample_rate,
                 callback=self._stop_playing
             )
-        else:
-            self.audio_manager.stop_playback()
-            self._stop_playing()
     
     def _stop_playing(self):
         """停止播放"""
@@ -275,10 +309,10 @@ class AudioSegmentWidget(QFrame):
             QMessageBox.warning(self, "警告", "录音功能不可用")
             return
             
-        if not self.audio_manager.is_recording():
-            self._start_recording()
-        else:
+        if self.audio_manager.owns_recording(self._on_recording_finished):
             self._stop_recording()
+        else:
+            self._start_recording()
     
     def _start_recording(self):
         """开始录音"""
@@ -314,16 +348,16 @@ class AudioSegmentWidget(QFrame):
         if not self.audio_manager or not self.segment.user_recording:
             return
             
-        if not self.audio_manager.is_playing():
+        if self.audio_manager.owns_playback(self._stop_user_playing):
+            self.audio_manager.stop_playback()
+            self._stop_user_playing()
+        else:
             self.play_user_button.setText("停止播放")
             self.audio_manager.play_audio(
                 self.segment.user_recording['data'],
                 self.segment.user_recording['sample_rate'],
                 callback=self._stop_user_playing
             )
-        else:
-            self.audio_manager.stop_playback()
-            self._stop_user_playing()
     
     def _stop_user_playing(self):
         """停止播放用户录音"""
@@ -348,6 +382,8 @@ class MainWindow(QMainWindow):
         self.whisper_worker = None
         self.audio_segments = []
         self.current_model_size = "small"
+        # 所有段落组件共享同一个音频管理器
+        self.audio_manager = AudioManager() if AudioManager else None
         
         self.setWindowTitle("语言学习工具 - Whisper离线转录")
         self.setGeometry(100, 100, 1200, 800)
@@ -475,7 +511,7 @@ class MainWindow(QMainWindow):
         self.audio_segments.append(segment)
         
         # 创建段落显示组件
-        segment_widget = AudioSegmentWidget(segment)
+        segment_widget = AudioSegmentWidget(segment, self.audio_manager)
         self.scroll_layout.addWidget(segment_widget)
         
         # 滚动到最新添加的段落
@@ -507,6 +543,12 @@ class MainWindow(QMainWindow):
     
     def _clear_results(self):
         """清除转录结果"""
+        # 先停止共享管理器中的播放和录音，并解除对即将移除的组件的引用
+        if self.audio_manager:
+            self.audio_manager.stop_playback()
+            self.audio_manager.stop_recording()
+            self.audio_manager.clear_callbacks()
+        
         # 清除所有段落组件
         for i in reversed(range(self.scroll_layout.count())):
             child = self.scroll_layout.itemAt(i).widget()
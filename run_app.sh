@@ -33,7 +33,7 @@ echo "检查依赖包..."
 missing_packages=()
 
 # 检查关键依赖
-packages=("PyQt6" "whisper" "librosa" "numpy" "matplotlib" "pyaudio")
+packages=("PyQt6" "faster_whisper" "librosa" "numpy" "matplotlib" "pyaudio")
 for package in "${packages[@]}"; do
     python3 -c "import $package" 2>/dev/null
     if [[ $? -ne 0 ]]; then
@@ -84,6 +84,11 @@ if [[ ! -f "audio_player.py" ]]; then
     echo "音频播放功能可能不可用"
 fi
 
+if [[ ! -f "waveform.py" ]]; then
+    echo "✗ 未找到waveform.py文件"
+    exit 1
+fi
+
 # 创建必要的目录
 mkdir -p logs
 mkdir -p temp
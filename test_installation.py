@@ -25,10 +25,10 @@ def test_import(module_name, description=""):
 def test_whisper():
     """测试Whisper模型"""
     try:
-        import whisper
+        from faster_whisper import WhisperModel
         print("测试Whisper模型加载...")
         # 尝试加载最小的模型
-        model = whisper.load_model("tiny")
+        model = WhisperModel("tiny", device="cpu", compute_type="int8")
         print("✓ Whisper模型加载成功")
         return True
     except Exception as e:
@@ -41,24 +41,26 @@ def test_audio_devices():
         import pyaudio
         p = pyaudio.PyAudio()
         
-        print("音频输入设备:")
+        # 只遍历一次设备，按输入/输出分类
         input_devices = []
+        output_devices = []
         for i in range(p.get_device_count()):
             info = p.get_device_info_by_index(i)
             if info['maxInputChannels'] > 0:
                 input_devices.append(info['name'])
-                print(f"  - {info['name']}")
-        
-        print("音频输出设备:")
-        output_devices = []
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
             if info['maxOutputChannels'] > 0:
                 output_devices.append(info['name'])
-                print(f"  - {info['name']}")
         
         p.terminate()
         
+        print("音频输入设备:")
+        for name in input_devices:
+            print(f"  - {name}")
+        
+        print("音频输出设备:")
+        for name in output_devices:
+            print(f"  - {name}")
+        
         if input_devices and output_devices:
             print("✓ 音频设备检测成功")
             return True
@@ -75,6 +77,7 @@ def test_file_structure():
     required_files = [
         "main.py",
         "audio_player.py", 
+        "waveform.py",
         "requirements.txt",
         "README.md"
     ]
@@ -124,7 +127,8 @@ def main():
     print("1. 测试Python依赖包:")
     modules_to_test = [
         ("PyQt6", "GUI框架"),
-        ("whisper", "语音识别"),
+        ("PyQt6.QtMultimedia", "音频播放"),
+        ("faster_whisper", "语音识别"),
         ("librosa", "音频分析"),
         ("numpy", "数值计算"),
         ("matplotlib", "图形绘制"),
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+波形处理模块
+提供波形图绘制用的包络降采样
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+def _envelope_numpy(audio_data: np.ndarray, stride: int) -> np.ndarray:
+    """每stride个样本为一个区间计算最小/最大值（最后一个区间可不满），返回交错排列的包络数组"""
+    starts = np.arange(0, len(audio_data), stride)
+    envelope = np.empty(len(starts) * 2, dtype=audio_data.dtype)
+    envelope[0::2] = np.minimum.reduceat(audio_data, starts)
+    envelope[1::2] = np.maximum.reduceat(audio_data, starts)
+    return envelope
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def compute_envelope(audio_data, stride):
+        """每stride个样本为一个区间计算最小/最大值（Numba并行版本，单次遍历）"""
+        n = len(audio_data)
+        buckets = (n + stride - 1) // stride
+        envelope = np.empty(buckets * 2, dtype=audio_data.dtype)
+        for i in prange(buckets):
+            base = i * stride
+            end = min(base + stride, n)
+            lo = audio_data[base]
+            hi = audio_data[base]
+            for j in range(base + 1, end):
+                v = audio_data[j]
+                if v < lo:
+                    lo = v
+                elif v > hi:
+                    hi = v
+            envelope[2 * i] = lo
+            envelope[2 * i + 1] = hi
+        return envelope
+else:
+    compute_envelope = _envelope_numpy